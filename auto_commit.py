@@ -1,14 +1,24 @@
+import fcntl
 import os
 import random
+import stat
 import json
-from datetime import datetime, timedelta
-from git import Repo
-import pytz
+import tempfile
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
 import logging
-from dotenv import load_dotenv
+import logging.handlers
 
-# Load environment variables from .env file
-load_dotenv()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Load environment variables from .env file, unless the environment already provides them
+if not os.environ.get("REPO_PATH"):
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 # Get the repository path from the .env file
 REPO_PATH = os.getenv("REPO_PATH")
@@ -18,131 +28,213 @@ if not REPO_PATH:
 # Constants
 COUNTER_FILE = os.path.join(REPO_PATH, "counter.txt")
 COMMIT_TIMES_FILE = os.path.join(REPO_PATH, "commit_times.json")
-LOG_FILE = os.path.join(REPO_PATH, "commit_log.txt")
-ERROR_LOG_FILE = os.path.join(REPO_PATH, "error_log.txt")
-TIMEZONE = pytz.timezone("US/Eastern")
+# Per-repository run lock, kept in the git dir so it stays out of the worktree
+LOCK_FILE = os.path.join(REPO_PATH, ".git", "autocommit.lock")
+# Logs live outside the repository so commits only ever carry the counter
+LOG_DIR = os.path.join(os.getenv("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"), "autocommit")
+LOG_FILE = os.path.join(LOG_DIR, "commit_log.txt")
+ERROR_LOG_FILE = os.path.join(LOG_DIR, "error_log.txt")
+TIMEZONE = ZoneInfo("America/New_York")
 
-# Logging Setup
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s",
-)
+# Lets pushes share an open SSH connection instead of re-authenticating each time
+SSH_COMMAND = "ssh -o ControlMaster=auto -o ControlPath=~/.ssh/cm-%r@%h:%p -o ControlPersist=600"
 
 # Error Logging
 error_logger = logging.getLogger("error_logger")
-error_logger.addHandler(logging.FileHandler(ERROR_LOG_FILE))
+
+
+def setup_logging():
+    """Attach the log file handlers; called only once a run has something to log."""
+    if error_logger.handlers:
+        return
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    # Buffer records so they reach the log file in one write, opening it only on flush
+    log_file_handler = logging.FileHandler(LOG_FILE, mode="a", delay=True)
+    log_file_handler.setFormatter(logging.Formatter("%(created)d - %(message)s"))
+    logging.basicConfig(
+        level=logging.INFO,
+        handlers=[logging.handlers.MemoryHandler(capacity=64, flushLevel=logging.WARNING, target=log_file_handler)],
+    )
+    error_logger.addHandler(logging.FileHandler(ERROR_LOG_FILE, mode="a", delay=True))
 
 
 def select_commit_times(working_hours, num_commits):
-    """Generate random commit times for the day."""
+    """Generate random commit times for the day, as sorted epoch seconds."""
     start, end = working_hours
-    start_time = datetime.combine(datetime.now(TIMEZONE).date(), datetime.strptime(start, "%H:%M").time()).astimezone(TIMEZONE)
-    end_time = datetime.combine(datetime.now(TIMEZONE).date(), datetime.strptime(end, "%H:%M").time()).astimezone(TIMEZONE)
+    today = datetime.now(TIMEZONE).date()
+    start_epoch = int(datetime.combine(today, time.fromisoformat(start), tzinfo=TIMEZONE).timestamp())
+    end_epoch = int(datetime.combine(today, time.fromisoformat(end), tzinfo=TIMEZONE).timestamp())
+
+    commit_times = [random.randint(start_epoch, end_epoch) for _ in range(num_commits)]
+    commit_times.sort()
 
-    commit_times = []
-    for _ in range(num_commits):
-        delta = (end_time - start_time).total_seconds()
-        random_offset = random.randint(0, int(delta))
-        commit_time = start_time + timedelta(seconds=random_offset)
-        commit_times.append(commit_time.isoformat())
+    return commit_times
 
-    return sorted(commit_times)
+
+def write_atomic(path, data):
+    """Replace a file's contents in one step so readers never see a partial write."""
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    file = tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path), delete=False)
+    try:
+        with file:
+            # NamedTemporaryFile creates the file 0600; keep the target's usual permissions
+            os.fchmod(file.fileno(), mode)
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, path)
+    except BaseException:
+        # Don't leave a stray temporary file behind in the repository
+        os.unlink(file.name)
+        raise
 
 
 def save_commit_times(commit_times):
     """Save commit times to a JSON file."""
-    with open(COMMIT_TIMES_FILE, "w") as file:
-        json.dump(commit_times, file)
+    data = orjson.dumps(commit_times).decode() if orjson else json.dumps(commit_times)
+    write_atomic(COMMIT_TIMES_FILE, data)
 
 
 def load_commit_times():
     """Load commit times from the JSON file."""
     if os.path.exists(COMMIT_TIMES_FILE):
-        with open(COMMIT_TIMES_FILE, "r") as file:
-            return json.load(file)
+        with open(COMMIT_TIMES_FILE, "rb") as file:
+            data = file.read()
+        commit_times = orjson.loads(data) if orjson else json.loads(data)
+        # Files written before the switch to epoch seconds hold ISO strings
+        return [int(datetime.fromisoformat(ct).timestamp()) if isinstance(ct, str) else ct for ct in commit_times]
     return []
 
 
+# In-memory counter value, read from disk on first use
+_counter_cache = None
+
+
 def update_counter():
-    """Update the counter file."""
-    if not os.path.exists(COUNTER_FILE):
-        with open(COUNTER_FILE, "w") as file:
-            file.write("0")
+    """Update the counter in memory; call save_counter() to write it out."""
+    global _counter_cache
+    if _counter_cache is None:
+        if os.path.exists(COUNTER_FILE):
+            with open(COUNTER_FILE, "r") as file:
+                _counter_cache = int(file.read().strip())
+        else:
+            _counter_cache = 0
 
-    with open(COUNTER_FILE, "r") as file:
-        counter = int(file.read().strip())
+    counter = _counter_cache
+    _counter_cache = counter + random.randint(1, 100)
 
-    increment = random.randint(1, 100)
-    new_counter = counter + increment
+    return counter, _counter_cache
 
-    with open(COUNTER_FILE, "w") as file:
-        file.write(str(new_counter))
 
-    return counter, new_counter
+def save_counter():
+    """Write the cached counter back to the counter file."""
+    if _counter_cache is not None:
+        write_atomic(COUNTER_FILE, str(_counter_cache))
 
 
 def make_commit(repo, counter_before, counter_after):
     """Commit changes to the repository."""
     try:
-        repo.git.add(COUNTER_FILE, LOG_FILE, ERROR_LOG_FILE)
         commit_message = f"Updated counter from {counter_before} to {counter_after}"
-        repo.git.commit(m=commit_message)
+        # Stage and commit through GitPython's index instead of spawning git
+        repo.index.add([COUNTER_FILE])
+        repo.index.commit(commit_message, skip_hooks=True)
         return commit_message
     except Exception as e:
-        error_logger.error(f"Commit failed: {e}")
+        error_logger.error("Commit failed: %s", e)
         raise
 
 
 def push_changes(repo):
     """Push committed changes to the remote repository."""
     try:
-        repo.git.push()
+        # Only fall back to our SSH command when the user hasn't configured one
+        if os.environ.get("GIT_SSH_COMMAND") or repo.git.config("core.sshCommand", with_exceptions=False):
+            repo.git.push()
+        else:
+            with repo.git.custom_environment(GIT_SSH_COMMAND=SSH_COMMAND):
+                repo.git.push()
     except Exception as e:
-        error_logger.error(f"Push failed: {e}")
+        error_logger.error("Push failed: %s", e)
         raise
 
 
 def main():
     """Main script logic."""
     try:
-        repo = Repo(REPO_PATH)
+        # Leave it to the run already in progress; the lock is released when the process exits
+        lock_fd = os.open(LOCK_FILE, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock_fd)
+            return
 
         # Determine if we're setting up the day or executing a commit
         now = datetime.now(TIMEZONE)
         commit_times = load_commit_times()
 
+        # Drop times left over from a previous day (e.g. a missed wakeup) so today still gets set up
+        day_start = int(datetime.combine(now.date(), time(), tzinfo=TIMEZONE).timestamp())
+        commit_times = [ct for ct in commit_times if ct >= day_start]
+
         if not commit_times:
             # Setup for the day
+            setup_logging()
             working_hours = ["09:00", "19:00"] if now.weekday() < 6 else ["11:00", "16:00"]
             num_commits = 1 if now.weekday() == 6 else random.randint(1, 10)
             commit_times = select_commit_times(working_hours, num_commits)
             save_commit_times(commit_times)
             print(f"Commit times for the day have been set:")
             for ct in commit_times:
-                print(f"- {datetime.fromisoformat(ct).strftime('%Y-%m-%d %H:%M:%S %Z')}")
-            logging.info(f"Commit times for the day: {commit_times}")
+                print(f"- {datetime.fromtimestamp(ct, TIMEZONE).strftime('%Y-%m-%d %H:%M:%S %Z')}")
+            logging.info("Commit times for the day: %s", commit_times)
         else:
-            # Check if it's time to commit
-            next_commit_time = datetime.fromisoformat(commit_times[0]).astimezone(TIMEZONE)
-            if now >= next_commit_time:
+            # Collect every commit time that has come due since the last run
+            now_epoch = int(now.timestamp())
+            due_times = []
+            while commit_times and now_epoch >= commit_times[0]:
+                due_times.append(commit_times.pop(0))
+
+            if due_times:
+                setup_logging()
                 print(f"Making a commit at {now.strftime('%Y-%m-%d %H:%M:%S %Z')}...")
+                # GitPython is slow to import, so only load it when a commit is due
+                from git import Repo
+
+                repo = Repo(REPO_PATH)
+
+                # Coalesce the due counter updates into a single commit and push
                 counter_before, counter_after = update_counter()
+                for _ in due_times[1:]:
+                    counter_after = update_counter()[1]
+                save_counter()
                 commit_message = make_commit(repo, counter_before, counter_after)
                 push_changes(repo)
 
                 # Log the commit
                 logging.info(
-                    f"Commit executed at {now}: {commit_message} (Remaining commit times: {commit_times[1:]})"
+                    "Commit executed at %s: %s (Remaining commit times: %s)",
+                    now,
+                    commit_message,
+                    commit_times,
                 )
                 print(f"Commit made: {commit_message}")
 
-                # Remove the executed time and save
-                commit_times.pop(0)
+                # Save the remaining times
                 save_commit_times(commit_times)
 
     except Exception as e:
-        error_logger.error(f"Script error: {e}")
+        setup_logging()
+        error_logger.error("Script error: %s", e)
         print(f"Error occurred: {e}")
 
 
@@ -0,0 +1,54 @@
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from auto_commit import REPO_PATH, TIMEZONE, load_commit_times
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_commit.py")
+
+
+def build_commands(commit_times, use_at=False):
+    """Build one scheduler command per upcoming commit time."""
+    now = datetime.now(TIMEZONE)
+    commands = []
+    for ct in commit_times:
+        commit_time = datetime.fromtimestamp(ct, TIMEZONE)
+        if commit_time <= now:
+            continue
+        if use_at:
+            # `at` reads the job from stdin, expects the system's local time and only
+            # fires on whole minutes, so round up to avoid waking before the commit is due
+            at_time = datetime.fromtimestamp(-(-ct // 60) * 60)
+            local_time = at_time.strftime("%Y%m%d%H%M")
+            commands.append((["at", "-t", local_time], f"{shlex.quote(sys.executable)} {shlex.quote(SCRIPT)}\n"))
+        else:
+            utc_time = commit_time.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+            # Transient units don't inherit our environment, so forward what auto_commit.py reads
+            setenv = [f"--setenv=REPO_PATH={REPO_PATH}"]
+            if os.environ.get("XDG_STATE_HOME"):
+                setenv.append(f"--setenv=XDG_STATE_HOME={os.environ['XDG_STATE_HOME']}")
+            commands.append(
+                (["systemd-run", "--user", f"--on-calendar={utc_time}", *setenv, sys.executable, SCRIPT], None)
+            )
+    return commands
+
+
+def main():
+    """Register a wakeup for each of today's commit times."""
+    parser = argparse.ArgumentParser(description="Schedule auto_commit.py runs at today's commit times.")
+    parser.add_argument("--at", action="store_true", help="use at(1) jobs instead of systemd timers")
+    parser.add_argument("--apply", action="store_true", help="register the jobs instead of printing them")
+    args = parser.parse_args()
+
+    for command, job in build_commands(load_commit_times(), use_at=args.at):
+        if args.apply:
+            subprocess.run(command, input=job, text=True, check=True)
+        else:
+            print(shlex.join(command) if job is None else f"echo {shlex.quote(job.strip())} | {shlex.join(command)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("REPO_PATH", ROOT)
+sys.path.insert(0, ROOT)
+
+import auto_commit
+
+
+class AutoCommitTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        for name, filename in [
+            ("COUNTER_FILE", "counter.txt"),
+            ("COMMIT_TIMES_FILE", "commit_times.json"),
+            ("LOCK_FILE", "autocommit.lock"),
+        ]:
+            patcher = mock.patch.object(auto_commit, name, os.path.join(self.dir, filename))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class LoadCommitTimesTest(AutoCommitTestCase):
+    def test_mixed_iso_and_epoch_entries(self):
+        with open(auto_commit.COMMIT_TIMES_FILE, "w") as file:
+            json.dump(["2025-01-13T10:09:22-05:00", 1736783362], file)
+
+        self.assertEqual(auto_commit.load_commit_times(), [1736780962, 1736783362])
+
+
+class WriteAtomicTest(AutoCommitTestCase):
+    def test_keeps_existing_mode(self):
+        path = os.path.join(self.dir, "counter.txt")
+        with open(path, "w") as file:
+            file.write("1")
+        os.chmod(path, 0o644)
+
+        auto_commit.write_atomic(path, "2")
+
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644)
+        with open(path) as file:
+            self.assertEqual(file.read(), "2")
+
+    def test_new_file_follows_umask(self):
+        path = os.path.join(self.dir, "commit_times.json")
+        umask = os.umask(0o022)
+        self.addCleanup(os.umask, umask)
+
+        auto_commit.write_atomic(path, "[]")
+
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644)
+        self.assertEqual(os.listdir(self.dir), ["commit_times.json"])
+
+
+class MainTest(AutoCommitTestCase):
+    def test_due_times_are_coalesced_into_one_commit(self):
+        now = int(time.time())
+        today = datetime.now(auto_commit.TIMEZONE).date()
+        day_start = int(datetime.combine(today, datetime.min.time(), tzinfo=auto_commit.TIMEZONE).timestamp())
+        due = [max(now - offset, day_start) for offset in (3, 2, 1)]
+        upcoming = now + 3600
+        auto_commit.save_commit_times(due + [upcoming])
+
+        with mock.patch.dict(sys.modules, {"git": mock.MagicMock()}), \
+                mock.patch.object(auto_commit, "_counter_cache", None), \
+                mock.patch.object(auto_commit, "setup_logging"), \
+                mock.patch.object(auto_commit, "make_commit", return_value="msg") as make_commit, \
+                mock.patch.object(auto_commit, "push_changes") as push_changes, \
+                mock.patch("builtins.print"):
+            auto_commit.main()
+
+        make_commit.assert_called_once()
+        push_changes.assert_called_once()
+        _, counter_before, counter_after = make_commit.call_args.args
+        self.assertEqual(counter_before, 0)
+        with open(auto_commit.COUNTER_FILE) as file:
+            self.assertEqual(int(file.read()), counter_after)
+        # Three increments of 1-100 each
+        self.assertTrue(3 <= counter_after <= 300)
+        self.assertEqual(auto_commit.load_commit_times(), [upcoming])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+import unittest
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("REPO_PATH", ROOT)
+sys.path.insert(0, ROOT)
+
+from schedule import build_commands
+
+
+class BuildCommandsTest(unittest.TestCase):
+    def setUp(self):
+        # A whole minute an hour from now
+        self.minute = (int(time.time()) // 60 + 60) * 60
+
+    def test_at_rounds_up_to_the_next_minute(self):
+        [(command, _)] = build_commands([self.minute + 32], use_at=True)
+        self.assertEqual(command[:2], ["at", "-t"])
+        self.assertEqual(command[2], datetime.fromtimestamp(self.minute + 60).strftime("%Y%m%d%H%M"))
+
+    def test_at_keeps_whole_minutes(self):
+        [(command, _)] = build_commands([self.minute], use_at=True)
+        self.assertEqual(command[2], datetime.fromtimestamp(self.minute).strftime("%Y%m%d%H%M"))
+
+    def test_systemd_forwards_repo_path(self):
+        [(command, _)] = build_commands([self.minute])
+        self.assertEqual(command[:2], ["systemd-run", "--user"])
+        self.assertIn(f"--setenv=REPO_PATH={os.environ['REPO_PATH']}", command)
+
+    def test_past_times_are_skipped(self):
+        self.assertEqual(build_commands([int(time.time()) - 60]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()